@@ -15,8 +15,16 @@ AI Upscale (GIMP 3)
 
 import sys
 import os
+import ctypes
+import hashlib
+import math
+import shutil
+import struct
 import tempfile
 import subprocess
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import platform  # added
 
@@ -88,6 +96,35 @@ MODELS_DIR = os.path.join(RESRGAN_DIR, "models")
 DEFAULT_OUTPUT_FACTOR = 1.0
 
 
+# Selection regions
+SELECTION_CELL = 16  # grid size (px) used to find disjoint selection islands
+REGION_CONTEXT_PAD = 16  # extra source pixels around each region for model context
+REGION_JOB_OVERHEAD_PX = 512 * 512  # cost of one extra Real-ESRGAN run, expressed in pixels
+MAX_PARALLEL_JOBS = 2  # Real-ESRGAN runs share one Vulkan device, so keep this small
+PARALLEL_TILE_SIZE = 100  # '-t' tile size per run when several share the GPU (default: auto, sized for the whole card)
+
+
+# Memory governor
+MODEL_SCALE = 4  # only native x4 models are supported
+DEFAULT_MEMORY_BUDGET_MB = 0  # 0 = derive the budget from available RAM
+AVAILABLE_RAM_FRACTION = 0.75  # share of available RAM the plug-in may plan to use
+RESRGAN_OVERHEAD_BYTES = 256 * 1024 * 1024  # model weights and runtime per Real-ESRGAN process
+TILE_SIZES = (2048, 1024, 512, 256)  # tile edges tried, largest first, when one pass won't fit
+
+
+# Tile deduplication
+DEFAULT_DEDUP_TILES = False
+DEDUP_TILE = 64  # aligned tile edge (px) compared for duplicates
+DEDUP_MAX_UNIQUE_RATIO = 0.5  # above this share of unique tiles, use the normal path instead
+
+
+# Atlas batching
+DEFAULT_ATLAS_BATCH = False
+ATLAS_MAX_ITEM = 256  # drawables larger than this (px, either edge) get a Real-ESRGAN run of their own
+ATLAS_PAD = 8  # edge-clamped gutter around each item so neighbours cannot bleed into it
+ATLAS_MAX_EDGE = 2048  # atlas size limit; more items spill into further atlases
+
+
 # Platform detection
 PLATFORM = platform.system()
 if PLATFORM == "Windows":
@@ -130,8 +167,12 @@ def _find_valid_models(models_dir: str) -> list[str]:
 
 def _export_drawable_to_temp(drawable: Gimp.Drawable) -> str:
     """Export drawable to a temporary PNG file using GIMP 3 PDB export."""
+    return _export_image_to_temp(drawable.get_image())
+
+
+def _export_image_to_temp(image: Gimp.Image) -> str:
+    """Export the image composite to a temporary PNG file."""
     temp_file = tempfile.mktemp(suffix=".png")
-    image = drawable.get_image()
     file = Gio.File.new_for_path(temp_file)
     pdb = Gimp.get_pdb()
     procedure = pdb.lookup_procedure('file-png-export')
@@ -159,15 +200,19 @@ def _load_png_as_image(path: str) -> Gimp.Image:
     return result.index(1)
 
 
-def _run_resrgan(temp_input: str, temp_output: str, model: str):
+def _run_resrgan(temp_input: str, temp_output: str, model: str, tile_size: int = 0):
     """
     Run Real-ESRGAN upscaling. We set cwd to RESRGAN_DIR so '-n <model>'
-    can resolve model files in ./models automatically.
+    can resolve model files in ./models automatically. tile_size 0 lets
+    Real-ESRGAN pick its GPU tile size.
     """
     exe_path = _resolve_resrgan_executable()
+    args = [exe_path, "-i", temp_input, "-o", temp_output, "-n", model]
+    if tile_size > 0:
+        args += ["-t", str(tile_size)]
     try:
         proc = subprocess.Popen(
-            [exe_path, "-i", temp_input, "-o", temp_output, "-n", model],
+            args,
             cwd=RESRGAN_DIR,
             shell=SHELL,  # match gimp2_upscale.py behavior
             stdout=subprocess.PIPE,
@@ -177,7 +222,7 @@ def _run_resrgan(temp_input: str, temp_output: str, model: str):
         if proc.returncode != 0:
             raise RuntimeError(
                 "Real-ESRGAN failed.\n"
-                f"Command: {exe_path} -i \"{temp_input}\" -o \"{temp_output}\" -n \"{model}\"\n"
+                f"Command: {' '.join(args)}\n"
                 f"stdout:\n{stdout.decode(errors='ignore')}\n\n"
                 f"stderr:\n{stderr.decode(errors='ignore')}"
             )
@@ -185,39 +230,460 @@ def _run_resrgan(temp_input: str, temp_output: str, model: str):
         raise RuntimeError(f"Error running Real-ESRGAN: {e}") from e
 
 
+def _write_png(path: str, width: int, height: int, rgba: bytes | bytearray) -> None:
+    """Write 8-bit RGBA pixels straight to a PNG file (cheaper than a PDB export per small tile)."""
+    stride = width * 4
+    raw = b"".join(b"\x00" + rgba[y * stride:(y + 1) * stride] for y in range(height))
+
+    def _chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)))
+        f.write(_chunk(b"IDAT", zlib.compress(raw, 1)))
+        f.write(_chunk(b"IEND", b""))
+
+
+def _clamp_pad(rgba: bytes, width: int, height: int, pad: int) -> bytes:
+    """Grow 8-bit RGBA pixels by `pad` on every side, repeating the edge pixels."""
+    stride = width * 4
+    rows = []
+    for y in range(height):
+        row = rgba[y * stride:(y + 1) * stride]
+        rows.append(row[:4] * pad + row + row[-4:] * pad)
+    return b"".join([rows[0]] * pad + rows + [rows[-1]] * pad)
+
+
+def _write_atlas(path: str, atlas_w: int, atlas_h: int, placements: list[tuple[int, int, int]], get_pixels) -> None:
+    """
+    Build an 8-bit RGBA atlas and write it as PNG. `get_pixels(index)` returns
+    (rgba, slot_w, slot_h) for each (index, slot_x, slot_y) placement.
+    """
+    atlas = bytearray(atlas_w * atlas_h * 4)
+    for index, x, y in placements:
+        pixels, slot_w, slot_h = get_pixels(index)
+        stride = slot_w * 4
+        for row in range(slot_h):
+            start = ((y + row) * atlas_w + x) * 4
+            atlas[start:start + stride] = pixels[row * stride:(row + 1) * stride]
+    _write_png(path, atlas_w, atlas_h, atlas)
+
+
 def _export_layer_only_to_temp(image: Gimp.Image, layer: Gimp.Layer) -> str:
     """
     Export only the given layer composited on transparency (no merging with other layers).
-    Implementation: temporarily toggle visibility to export the composite with only this layer visible.
+    Implementation: export a snapshot in which only this layer (and its parent groups) is visible,
+    so nested layers render the same here as in the tiled and dedup paths.
     """
-    temp_file = tempfile.mktemp(suffix=".png")
-    pdb = Gimp.get_pdb()
-    export_proc = pdb.lookup_procedure('file-png-export')
-    if export_proc is None:
-        raise RuntimeError("Missing 'file-png-export' procedure.")
-    # Snapshot current visibility of all layers
-    layers = list(image.get_layers())
-    vis_map = [(l, l.get_visible()) for l in layers]
+    snapshot, _ = _snapshot_composite(image, layer)
     try:
-        # Hide all, show only requested layer
-        for l in layers:
-            l.set_visible(False)
-        layer.set_visible(True)
-        # Export the image composite (now effectively just this layer)
-        file = Gio.File.new_for_path(temp_file)
-        cfg = export_proc.create_config()
-        cfg.set_property('run-mode', Gimp.RunMode.NONINTERACTIVE)
-        cfg.set_property('image', image)
-        cfg.set_property('file', file)
-        export_proc.run(cfg)
+        return _export_image_to_temp(snapshot)
     finally:
-        # Restore visibilities
-        for l, v in vis_map:
-            try:
-                l.set_visible(v)
-            except Exception:
-                pass
-    return temp_file
+        snapshot.delete()
+
+
+def _item_path(image: Gimp.Image, item: Gimp.Item) -> list[int]:
+    """Return the positions leading from the top-level layers down to item, through its groups."""
+    path = []
+    while item is not None:
+        path.insert(0, image.get_item_position(item))
+        item = item.get_parent()
+    return path
+
+
+def _snapshot_composite(image: Gimp.Image, layer: Gimp.Layer | None = None) -> tuple[Gimp.Image, Gimp.Layer]:
+    """
+    Duplicate the image and merge its visible layers into one canvas-sized layer.
+    If `layer` is given, only that layer is kept visible (like _export_layer_only_to_temp).
+    The caller owns the returned image and must delete it.
+    """
+    snapshot = image.duplicate()
+    if layer is not None:
+        # Walk the same path of positions down the duplicate's layer tree,
+        # keeping only the layer and its ancestor groups visible.
+        siblings = snapshot.get_layers()
+        for position in _item_path(image, layer):
+            for i, l in enumerate(siblings):
+                l.set_visible(i == position)
+            siblings = siblings[position].get_children()
+    layer = snapshot.merge_visible_layers(Gimp.MergeType.CLIP_TO_IMAGE)
+    if layer is None:
+        snapshot.delete()
+        raise RuntimeError("Nothing visible to upscale.")
+    return snapshot, layer
+
+
+def _export_region_to_temp(source: Gimp.Layer, rect: tuple[int, int, int, int]) -> str:
+    """Export the (x, y, w, h) rectangle of a canvas-sized layer to a temporary PNG file."""
+    x, y, w, h = rect
+    region_image = Gimp.Image.new(w, h, source.get_image().get_base_type())
+    try:
+        layer = _new_layer(region_image, "Region", w, h)
+        source.get_buffer().copy(
+            Gegl.Rectangle.new(x, y, w, h), Gegl.AbyssPolicy.NONE,
+            layer.get_buffer(), Gegl.Rectangle.new(0, 0, w, h)
+        )
+        layer.update(0, 0, w, h)
+        return _export_image_to_temp(region_image)
+    finally:
+        region_image.delete()
+
+
+def _run_resrgan_jobs(jobs: list[tuple[str, str]], model: str, on_done=None, max_workers: int = MAX_PARALLEL_JOBS):
+    """
+    Run Real-ESRGAN for several (input, output) pairs concurrently.
+    Only the subprocesses run on worker threads; `on_done(count)` is called from
+    the calling thread so it may safely touch GIMP (e.g. progress updates).
+    Concurrent runs use a fixed small tile size so they fit on one GPU together.
+    """
+    workers = max(1, min(max_workers, MAX_PARALLEL_JOBS, len(jobs)))
+    tile_size = PARALLEL_TILE_SIZE if workers > 1 else 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_resrgan, src, dst, model, tile_size) for src, dst in jobs]
+        try:
+            for done, future in enumerate(as_completed(futures), start=1):
+                future.result()
+                if on_done is not None:
+                    on_done(done)
+        except BaseException:
+            # Don't start the queued runs once one has failed.
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+#endregion
+#region Selection regions
+
+
+Rect = tuple[int, int, int, int]
+
+
+def _selection_mask(image: Gimp.Image) -> tuple[bytes, Rect] | None:
+    """Return the selection mask (8-bit, row-major) cropped to its bounds, or None if empty."""
+    _, non_empty, x1, y1, x2, y2 = Gimp.Selection.bounds(image)
+    if not non_empty or x2 <= x1 or y2 <= y1:
+        return None
+    rect = (x1, y1, x2 - x1, y2 - y1)
+    buffer = image.get_selection().get_buffer()
+    mask = buffer.get(Gegl.Rectangle.new(*rect), 1.0, "Y u8", Gegl.AbyssPolicy.NONE)
+    return bytes(mask), rect
+
+
+def _mask_components(mask: bytes, width: int, height: int, cell: int) -> list[Rect]:
+    """
+    Find 8-connected islands of a mask on a coarse grid and return their bounding boxes.
+    A grid cell is occupied if any of its pixels is non-zero.
+    """
+    cols = (width + cell - 1) // cell
+    rows = (height + cell - 1) // cell
+    occupied = bytearray(cols * rows)
+    zero = bytes(cell)
+    for y in range(height):
+        row = mask[y * width:(y + 1) * width]
+        if not row.strip(b"\x00"):
+            continue
+        base = (y // cell) * cols
+        for c in range(cols):
+            if occupied[base + c]:
+                continue
+            chunk = row[c * cell:(c + 1) * cell]
+            if chunk != zero[:len(chunk)]:
+                occupied[base + c] = 1
+    components = []
+    for start in range(cols * rows):
+        if occupied[start] != 1:
+            continue
+        occupied[start] = 2
+        queue = deque([start])
+        c0 = c1 = start % cols
+        r0 = r1 = start // cols
+        while queue:
+            idx = queue.popleft()
+            r, c = divmod(idx, cols)
+            c0, c1, r0, r1 = min(c0, c), max(c1, c), min(r0, r), max(r1, r)
+            for nr in (r - 1, r, r + 1):
+                if nr < 0 or nr >= rows:
+                    continue
+                for nc in (c - 1, c, c + 1):
+                    if 0 <= nc < cols and occupied[nr * cols + nc] == 1:
+                        occupied[nr * cols + nc] = 2
+                        queue.append(nr * cols + nc)
+        x, y = c0 * cell, r0 * cell
+        components.append((x, y, min(width, (c1 + 1) * cell) - x, min(height, (r1 + 1) * cell) - y))
+    return components
+
+
+def _union_rect(a: Rect, b: Rect) -> Rect:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _rects_overlap(a: Rect, b: Rect) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _merge_regions(rects: list[Rect], overhead: int) -> list[Rect]:
+    """
+    Merge regions that overlap, or whose combined bounding box costs less to upscale
+    than running them separately (each separate run costs `overhead` extra pixels).
+    """
+    regions = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(i + 1, len(regions)):
+                a, b = regions[i], regions[j]
+                union = _union_rect(a, b)
+                if _rects_overlap(a, b) or union[2] * union[3] <= a[2] * a[3] + b[2] * b[3] + overhead:
+                    regions[i] = union
+                    del regions[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return regions
+
+
+def _pad_rect(rect: Rect, pad: int, width: int, height: int) -> Rect:
+    """Grow a rectangle by `pad` on every side, clipped to width x height."""
+    x0, y0 = max(0, rect[0] - pad), max(0, rect[1] - pad)
+    x1, y1 = min(width, rect[0] + rect[2] + pad), min(height, rect[1] + rect[3] + pad)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def _split_rect(rect: Rect, tile: int) -> list[Rect]:
+    """Split a rectangle into tiles of at most tile x tile pixels."""
+    x, y, w, h = rect
+    return [
+        (tx, ty, min(tile, x + w - tx), min(tile, y + h - ty))
+        for ty in range(y, y + h, tile)
+        for tx in range(x, x + w, tile)
+    ]
+
+
+def _selection_regions(image: Gimp.Image) -> list[Rect]:
+    """
+    Split the current selection into upscale regions in canvas coordinates.
+    Falls back to the whole canvas when nothing is selected.
+    """
+    width, height = image.get_width(), image.get_height()
+    selection = _selection_mask(image)
+    if selection is None:
+        return [(0, 0, width, height)]
+    mask, (mx, my, mw, mh) = selection
+    components = _mask_components(mask, mw, mh, SELECTION_CELL)
+    rects = [(mx + x, my + y, w, h) for x, y, w, h in components]
+    return _merge_regions(rects, REGION_JOB_OVERHEAD_PX)
+
+
+#endregion
+#region Atlas
+
+
+def _split_atlas_batch(drawables: list[Gimp.Drawable]) -> tuple[list[Gimp.Drawable], list[Gimp.Drawable]]:
+    """
+    Split drawables into (packed, oversized): the small ones share atlases, the rest
+    get a run of their own. A single small drawable is not worth packing.
+    """
+    small = [d for d in drawables if max(d.get_width(), d.get_height()) <= ATLAS_MAX_ITEM]
+    if len(small) < 2:
+        return [], list(drawables)
+    return small, [d for d in drawables if d not in small]
+
+
+def _pack_atlas(sizes: list[tuple[int, int]], pad: int, max_edge: int) -> list[tuple[int, int, list[tuple[int, int, int]]]]:
+    """
+    Shelf-pack items of the given sizes, each surrounded by `pad` pixels, into atlases.
+    Returns [(atlas_w, atlas_h, [(item_index, slot_x, slot_y), ...]), ...];
+    the item itself starts at (slot_x + pad, slot_y + pad).
+    """
+    slots = [(w + 2 * pad, h + 2 * pad) for w, h in sizes]
+    order = sorted(range(len(slots)), key=lambda i: (-slots[i][1], -slots[i][0]))
+    area = sum(w * h for w, h in slots)
+    width = min(max_edge, max(max(w for w, _ in slots), int(math.sqrt(area)) + 1))
+    atlases = []
+    placements, used_w, x, y, shelf_h = [], 0, 0, 0, 0
+    for i in order:
+        w, h = slots[i]
+        if x + w > width:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        if y + h > max_edge and placements:
+            atlases.append((used_w, y + shelf_h if x else y, placements))
+            placements, used_w, x, y, shelf_h = [], 0, 0, 0, 0
+        placements.append((i, x, y))
+        x += w
+        used_w = max(used_w, x)
+        shelf_h = max(shelf_h, h)
+    atlases.append((used_w, y + shelf_h, placements))
+    return atlases
+
+
+#endregion
+#region Memory
+
+
+def _available_memory() -> int | None:
+    """Return available physical memory in bytes, or None if it cannot be determined."""
+    try:
+        if PLATFORM == "Windows":
+            class _MemoryStatusEx(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+            status = _MemoryStatusEx()
+            status.dwLength = ctypes.sizeof(_MemoryStatusEx)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return int(status.ullAvailPhys)
+            return None
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return None
+
+
+def _memory_budget(budget_mb: int) -> int | None:
+    """
+    Combine available RAM and the user budget (MB, 0 = auto) into a byte limit.
+    Returns None when neither is known, which disables the governor.
+    """
+    available = _available_memory()
+    limit = int(available * AVAILABLE_RAM_FRACTION) if available else None
+    if budget_mb > 0:
+        user_limit = budget_mb * 1024 * 1024
+        limit = min(limit, user_limit) if limit else user_limit
+    return limit
+
+
+def _layer_bpp(drawable: Gimp.Drawable) -> int:
+    """Bytes per pixel of a new RGBA/GRAYA layer at the drawable's precision."""
+    channels = (1 if drawable.is_gray() else 3) + (1 if drawable.has_alpha() else 0)
+    return drawable.get_bpp() // channels * (channels if drawable.has_alpha() else channels + 1)
+
+
+def _rect_px(rect: Rect) -> int:
+    return rect[2] * rect[3]
+
+
+def _resrgan_peak(src_px: int) -> int:
+    """Memory used by one Real-ESRGAN process: 8-bit RGBA input and x4 output."""
+    return RESRGAN_OVERHEAD_BYTES + src_px * 4 * (1 + MODEL_SCALE ** 2)
+
+
+def _paste_peak(src_px: int, out_px: int) -> int:
+    """Memory used in GIMP while a loaded x4 result is scaled to out_px before copying."""
+    return src_px * MODEL_SCALE ** 2 * 4 + out_px * 4
+
+
+def _format_mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.0f} MB"
+
+
+def _memory_error(peak: int, budget: int) -> str:
+    return (
+        f"Not enough memory: this upscale needs about {_format_mb(peak)}, "
+        f"but the budget is {_format_mb(budget)}.\n"
+        "Try a smaller output factor, a smaller selection, or raise the memory budget."
+    )
+
+
+def _plan_canvas_upscale(width: int, height: int, output_factor: float, layer_bpp: int, budget: int | None) -> int | None:
+    """
+    Decide how to upscale a full canvas within the memory budget.
+    Returns None for a single pass, or the tile edge to stream through; raises if nothing fits.
+    """
+    src_px = width * height
+    final_px = max(1, int(round(width * output_factor))) * max(1, int(round(height * output_factor)))
+    peak = max(_resrgan_peak(src_px), _paste_peak(src_px, final_px) + final_px * layer_bpp)
+    if budget is None or peak <= budget:
+        return None
+    for tile in TILE_SIZES:
+        if tile >= max(width, height):
+            continue
+        context = min(width, tile + 2 * REGION_CONTEXT_PAD), min(height, tile + 2 * REGION_CONTEXT_PAD)
+        if _streaming_peak(width, height, output_factor, layer_bpp, context) <= budget:
+            return tile
+    raise RuntimeError(_memory_error(peak, budget))
+
+
+def _streaming_peak(width: int, height: int, output_factor: float, layer_bpp: int, context: tuple[int, int]) -> int:
+    """Peak memory when tiles of `context` size are upscaled one at a time into the final layer."""
+    src_px = width * height
+    final_px = max(1, int(round(width * output_factor))) * max(1, int(round(height * output_factor)))
+    ctx_px = context[0] * context[1]
+    ctx_out = int(ctx_px * output_factor ** 2) + 1
+    # The snapshot and the final layer stay alive for the whole run.
+    return max(_resrgan_peak(ctx_px), (src_px + final_px) * layer_bpp + _paste_peak(ctx_px, ctx_out))
+
+
+def _dedup_peak(width: int, height: int, output_factor: float, layer_bpp: int, tile_size: int) -> int:
+    """
+    Peak memory of a dedup run. Hashing holds the snapshot plus the unique padded tiles
+    (at most DEDUP_MAX_UNIQUE_RATIO of them before it gives up); packing holds those
+    tiles plus one atlas; rebuilding streams atlases into the final layer.
+    """
+    tile_count = ((width + DEDUP_TILE - 1) // DEDUP_TILE) * ((height + DEDUP_TILE - 1) // DEDUP_TILE)
+    unique_bytes = int(DEDUP_MAX_UNIQUE_RATIO * tile_count + 1) * tile_size * tile_size * 4
+    atlas_px = min(ATLAS_MAX_EDGE * ATLAS_MAX_EDGE, unique_bytes // 4)
+    collect = width * height * layer_bpp + unique_bytes
+    pack = unique_bytes + atlas_px * 4
+    side = int(math.sqrt(atlas_px)) + 1
+    return max(collect, pack, _streaming_peak(width, height, output_factor, layer_bpp, (side, side)))
+
+
+def _plan_selection_upscale(image: Gimp.Image, regions: list[Rect], layer_bpp: int, budget: int | None) -> tuple[list[tuple[Rect, Rect]], int]:
+    """
+    Turn selection regions into (context, region) jobs that fit the memory budget,
+    tiling oversized regions, and pick how many jobs may run at once.
+    """
+    width, height = image.get_width(), image.get_height()
+    jobs = [(_pad_rect(r, REGION_CONTEXT_PAD, width, height), r) for r in regions]
+    if budget is None:
+        return jobs, MAX_PARALLEL_JOBS
+    canvas = width * height * layer_bpp
+
+    def _fits(context: Rect) -> bool:
+        px = _rect_px(context)
+        return _resrgan_peak(px) <= budget and canvas + _paste_peak(px, px) <= budget
+
+    planned = []
+    for context, region in jobs:
+        if _fits(context):
+            planned.append((context, region))
+            continue
+        for tile in TILE_SIZES:
+            tiles = [(_pad_rect(t, REGION_CONTEXT_PAD, width, height), t) for t in _split_rect(region, tile)]
+            if all(_fits(c) for c, _ in tiles):
+                planned.extend(tiles)
+                break
+        else:
+            peak = max(_resrgan_peak(_rect_px(context)), canvas + _paste_peak(_rect_px(context), _rect_px(context)))
+            raise RuntimeError(_memory_error(peak, budget))
+    return planned, _parallel_workers([_resrgan_peak(_rect_px(c)) for c, _ in planned], budget)
+
+
+def _parallel_workers(peaks: list[int], budget: int | None) -> int:
+    """Run as many Real-ESRGAN jobs at once as the largest ones allow, up to MAX_PARALLEL_JOBS."""
+    if budget is None:
+        return MAX_PARALLEL_JOBS
+    peaks = sorted(peaks, reverse=True)
+    workers = 1
+    while workers < min(MAX_PARALLEL_JOBS, len(peaks)) and sum(peaks[:workers + 1]) <= budget:
+        workers += 1
+    return workers
 
 
 #endregion
@@ -262,13 +728,59 @@ def _handle_upscaled_layer(image: Gimp.Image, upscaled_layer: Gimp.Layer, output
     return new_layer
 
 
-def _handle_upscaled_selection(image: Gimp.Image, upscaled_layer: Gimp.Layer) -> Gimp.Layer:
+def _region_geometry(context: Rect, region: Rect, factor: float) -> tuple[tuple[int, int], Rect, Rect]:
     """
-    Insert upscaled content on same canvas and reveal only inside current selection.
+    For a `context` crop scaled by `factor`, return its scaled size and the
+    source/destination rectangles that place its `region` part on the scaled canvas.
+    """
+    cx, cy, cw, ch = context
+    rx, ry, rw, rh = region
+    x0, y0 = int(round(cx * factor)), int(round(cy * factor))
+    scaled_size = (max(1, int(round((cx + cw) * factor)) - x0), max(1, int(round((cy + ch) * factor)) - y0))
+    dx, dy = int(round(rx * factor)), int(round(ry * factor))
+    dw, dh = int(round((rx + rw) * factor)) - dx, int(round((ry + rh) * factor)) - dy
+    return scaled_size, (dx - x0, dy - y0, dw, dh), (dx, dy, dw, dh)
+
+
+def _copy_rects(src: Gimp.Layer, dst: Gimp.Layer, copies: list[tuple[Rect, Rect]]) -> None:
+    """Copy each (src_rect, dst_rect) pair from src to dst."""
+    src_buf = src.get_buffer()
+    dst_buf = dst.get_buffer()
+    for src_rect, dst_rect in copies:
+        if dst_rect[2] <= 0 or dst_rect[3] <= 0:
+            continue
+        src_buf.copy(Gegl.Rectangle.new(*src_rect), Gegl.AbyssPolicy.NONE, dst_buf, Gegl.Rectangle.new(*dst_rect))
+        dst.update(*dst_rect)
+
+
+def _paste_upscaled_copies(path: str, dst: Gimp.Layer, scaled_size: tuple[int, int], copies: list[tuple[Rect, Rect]]) -> None:
+    """Load an upscaled PNG, scale it once, copy it to every (src_rect, dst_rect) in dst, and free it."""
+    upscaled_image = _load_png_as_image(path)
+    try:
+        upscaled_layers = upscaled_image.get_layers()
+        if not upscaled_layers:
+            raise RuntimeError("Upscaled image has no layers.")
+        upscaled_layers[0].scale(scaled_size[0], scaled_size[1], False)
+        _copy_rects(upscaled_layers[0], dst, copies)
+    finally:
+        upscaled_image.delete()
+
+
+def _paste_upscaled_file(path: str, dst: Gimp.Layer, context: Rect, region: Rect, factor: float = 1.0) -> None:
+    """Load an upscaled PNG, paste its region into dst, and free it right away."""
+    scaled_size, src_rect, dst_rect = _region_geometry(context, region, factor)
+    _paste_upscaled_copies(path, dst, scaled_size, [(src_rect, dst_rect)])
+
+
+def _handle_upscaled_selection(image: Gimp.Image, upscaled_regions: list[tuple[Rect, Rect, str]]) -> Gimp.Layer:
+    """
+    Insert upscaled regions on same canvas and reveal only inside current selection.
+    Each item is (context, region, upscaled_png); results are loaded one at a time.
     """
     width, height = image.get_width(), image.get_height()
     new_layer = _new_layer(image, "AI Upscaled (Selection)", width, height)
-    _scale_and_copy(upscaled_layer, new_layer, width, height)
+    for context, region, upscaled_png in upscaled_regions:
+        _paste_upscaled_file(upscaled_png, new_layer, context, region)
     mask = new_layer.create_mask(Gimp.AddMaskType.SELECTION)
     new_layer.add_mask(mask)
     return new_layer
@@ -285,6 +797,258 @@ def _handle_upscaled_layer_only(image: Gimp.Image, upscaled_layer: Gimp.Layer, o
     return new_layer
 
 
+def _upscale_selection(image: Gimp.Image, model: str, base: float, span: float, layer_bpp: int, budget: int | None) -> Gimp.Layer:
+    """
+    Upscale each selection region as its own cropped job, running the jobs
+    concurrently, then composite them under the original selection mask.
+    """
+    planned, workers = _plan_selection_upscale(image, _selection_regions(image), layer_bpp, budget)
+    snapshot, source = _snapshot_composite(image)
+    jobs = []
+    try:
+        _progress(f"Exporting {len(planned)} selection region(s)...", base + 0.05 * span)
+        for context, _ in planned:
+            jobs.append((_export_region_to_temp(source, context), tempfile.mktemp(suffix=".png")))
+        snapshot.delete()
+        snapshot = None
+        _progress(f"Upscaling {len(jobs)} region(s) with {model}...", base + 0.15 * span)
+        _run_resrgan_jobs(
+            jobs, model,
+            lambda done: _progress(f"Upscaled region {done}/{len(jobs)}...", base + (0.15 + 0.45 * done / len(jobs)) * span),
+            workers
+        )
+        _progress("Compositing into selection...", base + 0.75 * span)
+        upscaled_regions = [(context, region, temp_output) for (context, region), (_, temp_output) in zip(planned, jobs)]
+        return _handle_upscaled_selection(image, upscaled_regions)
+    finally:
+        if snapshot is not None:
+            snapshot.delete()
+        for temp_input, temp_output in jobs:
+            _del_file(temp_input)
+            _del_file(temp_output)
+
+
+def _upscale_tiled(image: Gimp.Image, layer: Gimp.Layer | None, model: str, output_factor: float, tile: int, name: str, base: float, span: float) -> Gimp.Layer:
+    """
+    Low-memory variant of the entire/layer scopes: resize the canvas, then stream
+    padded tiles through Real-ESRGAN one at a time into the final layer, so the
+    full x4 intermediate is never held in memory.
+    """
+    width, height = image.get_width(), image.get_height()
+    tiles = _split_rect((0, 0, width, height), tile)
+    snapshot, source = _snapshot_composite(image, layer)
+    try:
+        final_w, final_h = _scaled_canvas_size(image, output_factor)
+        image.resize(final_w, final_h, 0, 0)
+        new_layer = _new_layer(image, name, final_w, final_h)
+        for i, region in enumerate(tiles):
+            context = _pad_rect(region, REGION_CONTEXT_PAD, width, height)
+            _progress(f"Upscaling tile {i+1}/{len(tiles)} with {model}...", base + (0.05 + 0.90 * i / len(tiles)) * span)
+            temp_input = _export_region_to_temp(source, context)
+            temp_output = tempfile.mktemp(suffix=".png")
+            try:
+                _run_resrgan(temp_input, temp_output, model)
+                _paste_upscaled_file(temp_output, new_layer, context, region, output_factor)
+            finally:
+                _del_file(temp_input)
+                _del_file(temp_output)
+        return new_layer
+    finally:
+        snapshot.delete()
+
+
+def _upscale_dedup(image: Gimp.Image, layer: Gimp.Layer | None, model: str, output_factor: float, name: str, layer_bpp: int, budget: int | None, base: float, span: float) -> tuple[Gimp.Layer | None, int, int]:
+    """
+    Cut the source into aligned tiles with context padding and hash them. If enough
+    tiles repeat, pack only the unique ones into atlases, upscale each atlas in one
+    Real-ESRGAN run, and rebuild the output from them.
+    Returns (new_layer, tile_count, unique_count); new_layer is None when too few
+    tiles repeat (hashing stops early, so unique_count is then only a lower bound),
+    and the caller should use the normal path.
+    """
+    width, height = image.get_width(), image.get_height()
+    size = DEDUP_TILE + 2 * REGION_CONTEXT_PAD
+    slot = size + 2 * ATLAS_PAD
+    # Check the budget before collecting any tiles.
+    if budget is not None:
+        peak = _dedup_peak(width, height, output_factor, layer_bpp, slot)
+        if peak > budget:
+            raise RuntimeError(_memory_error(peak, budget))
+    tiles = _split_rect((0, 0, width, height), DEDUP_TILE)
+    max_unique = DEDUP_MAX_UNIQUE_RATIO * len(tiles)
+    snapshot, source = _snapshot_composite(image, layer)
+    try:
+        buffer = source.get_buffer()
+        unique = {}  # (digest, w, h) -> tile index
+        unique_pixels = []
+        placements = []  # (tile index, region)
+        for n, region in enumerate(tiles):
+            if n % 256 == 0:
+                _progress(f"Hashing tiles {n+1}/{len(tiles)}...", base + 0.10 * span * n / len(tiles))
+            x, y, w, h = region
+            # Clamp at the canvas edge so every context has the same size.
+            rect = Gegl.Rectangle.new(x - REGION_CONTEXT_PAD, y - REGION_CONTEXT_PAD, size, size)
+            pixels = bytes(buffer.get(rect, 1.0, "R'G'B'A u8", Gegl.AbyssPolicy.CLAMP))
+            key = (hashlib.blake2b(pixels, digest_size=16).digest(), w, h)
+            index = unique.get(key)
+            if index is None:
+                if len(unique) + 1 > max_unique:
+                    # Too few repeats for dedup to pay off; stop collecting tiles.
+                    return None, len(tiles), len(unique) + 1
+                index = unique[key] = len(unique)
+                unique_pixels.append(pixels)
+            placements.append((index, region))
+    finally:
+        snapshot.delete()
+    # The clamped gutter keeps unrelated neighbouring tiles out of each tile's context.
+    atlases = _pack_atlas([(size, size)] * len(unique), ATLAS_PAD, ATLAS_MAX_EDGE)
+    workers = _parallel_workers([_resrgan_peak(w * h) for w, h, _ in atlases], budget)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        jobs = []
+        slots = {}  # tile index -> (atlas number, slot x, slot y)
+        for n, (atlas_w, atlas_h, atlas_placements) in enumerate(atlases):
+            for index, x, y in atlas_placements:
+                slots[index] = (n, x, y)
+            temp_input = os.path.join(temp_dir, f"atlas_{n}.png")
+            _write_atlas(
+                temp_input, atlas_w, atlas_h, atlas_placements,
+                lambda index: (_clamp_pad(unique_pixels[index], size, size, ATLAS_PAD), slot, slot)
+            )
+            jobs.append((temp_input, os.path.join(temp_dir, f"atlas_{n}_out.png")))
+        unique_pixels = None
+        _progress(f"Upscaling {len(unique)} unique of {len(tiles)} tiles with {model}...", base + 0.15 * span)
+        _run_resrgan_jobs(jobs, model, None, workers)
+        final_w, final_h = _scaled_canvas_size(image, output_factor)
+        image.resize(final_w, final_h, 0, 0)
+        new_layer = _new_layer(image, name, final_w, final_h)
+        # Place every tile from its unique result inside the (scaled) atlas.
+        copies = [[] for _ in atlases]
+        for index, (x, y, w, h) in placements:
+            n, slot_x, slot_y = slots[index]
+            context = (x - REGION_CONTEXT_PAD, y - REGION_CONTEXT_PAD, size, size)
+            _, (sx, sy, sw, sh), dst_rect = _region_geometry(context, (x, y, w, h), output_factor)
+            # The context starts after the gutter inside its atlas slot.
+            origin_x = int(round((slot_x + ATLAS_PAD) * output_factor))
+            origin_y = int(round((slot_y + ATLAS_PAD) * output_factor))
+            copies[n].append(((origin_x + sx, origin_y + sy, sw, sh), dst_rect))
+        for n, ((atlas_w, atlas_h, _), (_, temp_output)) in enumerate(zip(atlases, jobs)):
+            _progress(f"Rebuilding output {n+1}/{len(jobs)}...", base + (0.60 + 0.35 * n / len(jobs)) * span)
+            scaled_size = (max(1, int(round(atlas_w * output_factor))), max(1, int(round(atlas_h * output_factor))))
+            _paste_upscaled_copies(temp_output, new_layer, scaled_size, copies[n])
+        return new_layer, len(tiles), len(unique)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _slice_atlas_item(image: Gimp.Image, drawable: Gimp.Drawable, atlas_layer: Gimp.Layer, scale: int, x: int, y: int, output_factor: float) -> Gimp.Layer:
+    """
+    Cut one item (at x, y in source atlas coordinates) out of the upscaled atlas and
+    place it, scaled for the already resized canvas, on a canvas-sized layer like the
+    one _handle_upscaled_layer_only produces.
+    """
+    w, h = drawable.get_width(), drawable.get_height()
+    atlas_image = atlas_layer.get_image()
+    item = Gimp.Layer.new(atlas_image, "Item", w * scale, h * scale, _image_layer_type(atlas_image), 100.0, Gimp.LayerMode.NORMAL)
+    atlas_image.insert_layer(item, None, -1)
+    try:
+        _copy_rects(atlas_layer, item, [((x * scale, y * scale, w * scale, h * scale), (0, 0, w * scale, h * scale))])
+        item_w, item_h = max(1, int(round(w * output_factor))), max(1, int(round(h * output_factor)))
+        item.scale(item_w, item_h, False)
+        _, off_x, off_y = drawable.get_offsets()
+        dst_x, dst_y = int(round(off_x * output_factor)), int(round(off_y * output_factor))
+        new_layer = _new_layer(image, "AI Upscaled (Layer only)", image.get_width(), image.get_height())
+        _copy_rects(item, new_layer, [((0, 0, item_w, item_h), (dst_x, dst_y, item_w, item_h))])
+    finally:
+        atlas_image.remove_layer(item)
+    return new_layer
+
+
+def _rendered_layer_pixels(image: Gimp.Image, snapshot: Gimp.Image, drawable: Gimp.Drawable, pad: int) -> bytes:
+    """
+    Return the drawable's pixels as 8-bit RGBA, padded by `pad` clamped edge pixels,
+    with its layer mask and opacity applied, like the layer-only export renders it.
+    The mask is applied on the drawable's copy in `snapshot`, a duplicate of `image`.
+    """
+    layers = snapshot.get_layers()
+    for position in _item_path(image, drawable):
+        item = layers[position]
+        layers = item.get_children()
+    if item.get_mask() is not None:
+        item.remove_mask(Gimp.MaskApplyMode.APPLY)
+    w, h = item.get_width(), item.get_height()
+    rect = Gegl.Rectangle.new(-pad, -pad, w + 2 * pad, h + 2 * pad)
+    pixels = bytearray(item.get_buffer().get(rect, 1.0, "R'G'B'A u8", Gegl.AbyssPolicy.CLAMP))
+    opacity = item.get_opacity() / 100.0
+    if opacity < 1.0:
+        alpha = bytes(int(round(a * opacity)) for a in range(256))
+        pixels[3::4] = pixels[3::4].translate(alpha)
+    return bytes(pixels)
+
+
+def _upscale_atlas(image: Gimp.Image, drawables: list[Gimp.Drawable], model: str, output_factor: float, budget: int | None) -> tuple[int, int]:
+    """
+    Layer-only scope for many small drawables: pack them into padded atlases,
+    upscale each atlas with a single Real-ESRGAN run, and slice the results back
+    into one layer per drawable. Drawables too big to pack become one-item atlases,
+    so every drawable comes out the same way and the canvas is resized once.
+    Returns (packed_count, run_count).
+    """
+    packed, oversized = _split_atlas_batch(drawables)
+    drawables = packed + oversized
+    sizes = [(d.get_width(), d.get_height()) for d in drawables]
+    atlases = _pack_atlas(sizes[:len(packed)], ATLAS_PAD, ATLAS_MAX_EDGE) if packed else []
+    atlases += [(w + 2 * ATLAS_PAD, h + 2 * ATLAS_PAD, [(i, 0, 0)]) for i, (w, h) in enumerate(sizes) if i >= len(packed)]
+    peaks = [_resrgan_peak(w * h) for w, h, _ in atlases]
+    if budget is not None and max(peaks) > budget:
+        raise RuntimeError(_memory_error(max(peaks), budget))
+    workers = _parallel_workers(peaks, budget)
+    # Layer masks are applied on a duplicate so the user's layers are left untouched.
+    snapshot = image.duplicate()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        jobs = []
+        for n, (atlas_w, atlas_h, placements) in enumerate(atlases):
+            _progress(f"Packing atlas {n+1}/{len(atlases)}...", 0.05 * n / len(atlases))
+            temp_input = os.path.join(temp_dir, f"atlas_{n}.png")
+            # Clamp each drawable's own edges into the gutter instead of leaving it empty.
+            _write_atlas(
+                temp_input, atlas_w, atlas_h, placements,
+                lambda index: (
+                    _rendered_layer_pixels(image, snapshot, drawables[index], ATLAS_PAD),
+                    sizes[index][0] + 2 * ATLAS_PAD, sizes[index][1] + 2 * ATLAS_PAD
+                )
+            )
+            jobs.append((temp_input, os.path.join(temp_dir, f"atlas_{n}_out.png")))
+        snapshot.delete()
+        snapshot = None
+        _progress(f"Upscaling {len(drawables)} layers in {len(jobs)} run(s) with {model}...", 0.10)
+        _run_resrgan_jobs(
+            jobs, model,
+            lambda done: _progress(f"Upscaled atlas {done}/{len(jobs)}...", 0.10 + 0.60 * done / len(jobs)),
+            workers
+        )
+        final_w, final_h = _scaled_canvas_size(image, output_factor)
+        image.resize(final_w, final_h, 0, 0)
+        for n, ((atlas_w, _, placements), (_, temp_output)) in enumerate(zip(atlases, jobs)):
+            _progress(f"Slicing atlas {n+1}/{len(jobs)}...", 0.75 + 0.20 * n / len(jobs))
+            upscaled_image = _load_png_as_image(temp_output)
+            try:
+                upscaled_layers = upscaled_image.get_layers()
+                if not upscaled_layers:
+                    raise RuntimeError("Upscaled image has no layers.")
+                scale = upscaled_layers[0].get_width() // atlas_w
+                for index, x, y in placements:
+                    _slice_atlas_item(image, drawables[index], upscaled_layers[0], scale, x + ATLAS_PAD, y + ATLAS_PAD, output_factor)
+            finally:
+                upscaled_image.delete()
+        return len(packed), len(jobs)
+    finally:
+        if snapshot is not None:
+            snapshot.delete()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 #endregion
 #region Procedure run
 
@@ -318,7 +1082,7 @@ def ai_upscale(procedure, run_mode, image, drawables, config, data):
         GimpUi.init('python-fu-ai-upscale')
         _progress("AI Upscale: choose model and scope...")
         dialog = GimpUi.ProcedureDialog(procedure=procedure, config=config)
-        dialog.fill(None)  # Only 'output_factor' remains as a real argument
+        dialog.fill(None)  # 'output_factor', 'memory_budget', 'dedup_tiles' and 'atlas_batch' are the real arguments
         # --- Model radios ---
         frame = Gtk.Frame.new(_txt("Model"))
         vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=4)
@@ -372,6 +1136,10 @@ def ai_upscale(procedure, run_mode, image, drawables, config, data):
     output_factor = float(config.get_property('output_factor'))
     if not drawables:
         return _return_error(procedure, Gimp.PDBStatusType.EXECUTION_ERROR, "No drawable selected.")
+    budget = _memory_budget(int(config.get_property('memory_budget')))
+    dedup_tiles = bool(config.get_property('dedup_tiles'))
+    atlas_batch = bool(config.get_property('atlas_batch'))
+    summary = []
 
     # Do the work
     Gimp.context_push()
@@ -379,10 +1147,46 @@ def ai_upscale(procedure, run_mode, image, drawables, config, data):
     # Initialize status bar progress
     _progress_start("AI Upscale: starting...")
     try:
-        total = len(drawables)
-        for idx, drawable in enumerate(drawables):
+        remaining = drawables
+        if atlas_batch and scope_mode == "layer":
+            packed_count, runs = _upscale_atlas(image, drawables, current_model, output_factor, budget)
+            summary.append(f"Atlas: {len(drawables)} layers in {runs} run(s)")
+            if packed_count < len(drawables):
+                summary.append(f"Atlas: {len(drawables) - packed_count} layer(s) not packed (over {ATLAS_MAX_ITEM}px or alone)")
+            remaining = []
+        total = len(remaining)
+        for idx, drawable in enumerate(remaining):
             base = idx / total
             span = 1.0 / total
+            layer_bpp = _layer_bpp(drawable)
+            if scope_mode == "selection":
+                _upscale_selection(image, current_model, base, span, layer_bpp, budget)
+                _progress(f"Completed {idx+1}/{total}", (idx + 1) / total)
+                continue
+            if dedup_tiles:
+                name = "AI Upscaled (Layer only)" if scope_mode == "layer" else "AI Upscaled Layer"
+                source_layer = drawable if scope_mode == "layer" else None
+                deduped, tile_count, unique_count = _upscale_dedup(
+                    image, source_layer, current_model, output_factor, name, layer_bpp, budget, base, span
+                )
+                if deduped is not None:
+                    summary.append(
+                        f"Dedup: {unique_count}/{tile_count} tiles unique "
+                        f"({tile_count / max(1, unique_count):.1f}x, {100.0 * (1 - unique_count / max(1, tile_count)):.0f}% skipped)"
+                    )
+                    _progress(f"Completed {idx+1}/{total}", (idx + 1) / total)
+                    continue
+                summary.append(f"Dedup skipped: over {DEDUP_MAX_UNIQUE_RATIO:.0%} of {tile_count} tiles unique, used the normal path")
+            # Check predicted peak memory before exporting anything.
+            tile = _plan_canvas_upscale(image.get_width(), image.get_height(), output_factor, layer_bpp, budget)
+            if tile is not None:
+                _progress(f"Low memory: upscaling in {tile}px tiles...", base + 0.02 * span)
+                if scope_mode == "layer":
+                    _upscale_tiled(image, drawable, current_model, output_factor, tile, "AI Upscaled (Layer only)", base, span)
+                else:
+                    _upscale_tiled(image, None, current_model, output_factor, tile, "AI Upscaled Layer", base, span)
+                _progress(f"Completed {idx+1}/{total}", (idx + 1) / total)
+                continue
             _progress(f"Exporting layer {idx+1}/{total}...", base + 0.02 * span)
             if scope_mode == "layer":
                 temp_input = _export_layer_only_to_temp(image, drawable)
@@ -400,10 +1204,7 @@ def ai_upscale(procedure, run_mode, image, drawables, config, data):
                 if not upscaled_layers:
                     raise RuntimeError("Upscaled image has no layers.")
                 upscaled_layer = upscaled_layers[0]
-                if scope_mode == "selection":
-                    _progress("Compositing into selection...", base + 0.75 * span)
-                    _handle_upscaled_selection(image, upscaled_layer)
-                elif scope_mode == "layer":
+                if scope_mode == "layer":
                     _progress("Compositing layer...", base + 0.80 * span)
                     _handle_upscaled_layer_only(image, upscaled_layer, output_factor)
                 else:
@@ -422,6 +1223,8 @@ def ai_upscale(procedure, run_mode, image, drawables, config, data):
             _progress(f"Completed {idx+1}/{total}", (idx + 1) / total)
         Gimp.displays_flush()
         _progress("AI Upscaling complete!", 1.0)
+        if summary:
+            Gimp.message("AI Upscale summary:\n" + "\n".join(summary))
     except Exception as e:
         return _return_error(procedure, Gimp.PDBStatusType.EXECUTION_ERROR, f"Upscaling failed: {e}")
     finally:
@@ -464,6 +1267,27 @@ class AIUpscale(Gimp.PlugIn):
             0.05, 8.0, DEFAULT_OUTPUT_FACTOR,
             GObject.ParamFlags.READWRITE
         )
+        proc.add_int_argument(
+            "memory_budget",
+            _txt("Memory _Budget (MB)"),
+            _txt("Maximum memory to plan for; larger jobs are tiled or refused (0 = use available RAM)"),
+            0, 1048576, DEFAULT_MEMORY_BUDGET_MB,
+            GObject.ParamFlags.READWRITE
+        )
+        proc.add_boolean_argument(
+            "dedup_tiles",
+            _txt("_Deduplicate identical tiles"),
+            _txt("Upscale bit-identical tiles only once (entire image and layer only modes)"),
+            DEFAULT_DEDUP_TILES,
+            GObject.ParamFlags.READWRITE
+        )
+        proc.add_boolean_argument(
+            "atlas_batch",
+            _txt("Batch small layers into an _atlas"),
+            _txt("Layer only mode: pack selected layers up to {}px into one image and upscale it in a single run").format(ATLAS_MAX_ITEM),
+            DEFAULT_ATLAS_BATCH,
+            GObject.ParamFlags.READWRITE
+        )
         return proc
 
 